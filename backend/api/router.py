@@ -1,11 +1,17 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 import random
 import json
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 import torch
 from models.gnn import instantiate_model
 from simulation.engine import SuperaggregatorEngine
+from simulation.run_store import RunStore, file_checksum
 
 router = APIRouter()
 
@@ -24,6 +30,18 @@ if os.path.exists(weights_path):
 else:
     print(f"Notice: Trained weights not found at {weights_path}. GNN is using untreated random initialization parameters.")
 
+# Every simulation run is logged here (write-behind) so analysts can query history
+# instead of re-running scenarios
+run_store = RunStore(os.environ.get("MAAS_RUN_STORE", "simulation_runs.db"))
+weights_checksum = file_checksum(weights_path)
+
+# Baseline engines kept alive for incremental what-if edits, least recently used
+# evicted first. Each entry is (engine, lock): engines are edited in place, so a
+# batch holds its session's lock from snapshot to restore.
+MAX_SESSIONS = 16
+sessions = OrderedDict()
+sessions_lock = threading.Lock()
+
 class SimulationConfig(BaseModel):
     fleet_reduction_percentage: float = 90.0
     use_motorways: bool = True
@@ -34,6 +52,14 @@ class SimulationConfig(BaseModel):
         "economy": 30
     }
     eliminate_parking: bool = True
+    # Shard the GNN forward pass across worker processes (1 = single process)
+    # Capped at the core count: each partition is a worker process
+    num_partitions: int = Field(1, ge=1, le=os.cpu_count() or 1)
+    partition_method: Literal["spatial", "metis"] = "spatial" # coordinate bisection or METIS
+    # Fixes the stochastic starting state; a random seed is drawn (and recorded) when unset
+    seed: Optional[int] = None
+    # Also persist per-node GNN predictions in the run store
+    store_predictions: bool = False
 
 @router.get("/status")
 def get_status():
@@ -42,30 +68,137 @@ def get_status():
 @router.post("/simulate/baseline")
 def simulate_baseline(config: SimulationConfig):
     # Mocking a baseline simulation result
-    return {
+    seed = config.seed if config.seed is not None else random.randrange(2**31)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    results = {
         "scenario": "Baseline (Privately Owned Vehicles)",
-        "conflict_density": round(float(random.uniform(80, 100)), 2),
-        "avg_travel_time_mins": round(float(random.uniform(45, 60)), 1),
-        "fleet_utilization_pct": round(float(random.uniform(2, 5)), 1),
+        "conflict_density": round(float(rng.uniform(80, 100)), 2),
+        "avg_travel_time_mins": round(float(rng.uniform(45, 60)), 1),
+        "fleet_utilization_pct": round(float(rng.uniform(2, 5)), 1),
+        "seed": seed,
     }
+    
+    # run_id is None when the run store had to drop the record
+    results["run_id"] = run_store.record(
+        results["scenario"], {**config.dict(), "seed": seed}, results,
+        seed=seed, elapsed_ms=(time.perf_counter() - start) * 1000.0
+    )
+    return results
 
 @router.post("/simulate/ultra")
 def simulate_ultra(config: SimulationConfig):
     # The true MaaS / ULTRA Bill simulation result invoking the GNN over the Mumbai graph
+    seed = config.seed if config.seed is not None else random.randrange(2**31)
     try:
-        engine = SuperaggregatorEngine("mumbai_network.json", config)
+        start = time.perf_counter()
+        engine = SuperaggregatorEngine("mumbai_network.json", config, seed=seed)
         results = engine.run_simulation_step(gnn_model)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        
+        scenario = "ULTRA (MaaS Movement)"
+        # run_id is None when the run store had to drop the record
+        run_id = run_store.record(
+            scenario, {**config.dict(), "seed": seed}, results,
+            seed=seed,
+            graph_checksum=file_checksum("mumbai_network.json"),
+            weights_checksum=weights_checksum,
+            elapsed_ms=elapsed_ms,
+            predictions=engine.last_predictions if config.store_predictions else None
+        )
         
         return {
-            "scenario": "ULTRA (MaaS Movement)",
+            "scenario": scenario,
             "conflict_density": results["conflict_density"],
             "avg_travel_time_mins": results["avg_travel_time_mins"],
             "fleet_utilization_pct": results["fleet_utilization_pct"],
-            "config_applied": config.dict()
+            "config_applied": config.dict(),
+            "seed": seed,
+            "run_id": run_id
         }
     except Exception as e:
         return {"error": str(e), "message": "GNN Engine failed to run."}
 
+@router.get("/runs")
+def list_runs(scenario: Optional[str] = None, use_motorways: Optional[bool] = None,
+              min_reduction: Optional[float] = None, max_reduction: Optional[float] = None,
+              limit: int = 50, offset: int = 0):
+    # Recorded run history, newest first, served from the run store without touching the GNN
+    return run_store.query_runs(
+        limit=max(1, min(limit, 500)), offset=max(0, offset),
+        scenario=scenario, use_motorways=use_motorways,
+        min_reduction=min_reduction, max_reduction=max_reduction
+    )
+
+@router.get("/runs/aggregate")
+def aggregate_runs(metric: str = "conflict_density", group_by: str = "fleet_reduction_percentage",
+                   scenario: Optional[str] = None, use_motorways: Optional[bool] = None):
+    # e.g. mean conflict density per fleet reduction setting, split by scenario
+    try:
+        groups = run_store.aggregate(metric, group_by, scenario=scenario, use_motorways=use_motorways)
+    except ValueError as e:
+        return {"error": str(e), "message": "Invalid aggregate query."}
+    return {"metric": metric, "group_by": group_by, "groups": groups}
+
+@router.get("/runs/{run_id}/predictions")
+def get_run_predictions(run_id: str):
+    predictions = run_store.get_predictions(run_id)
+    if predictions is None:
+        return {"error": f"No stored predictions for run {run_id}", "message": "Set store_predictions to keep per-node outputs."}
+    return {"run_id": run_id, "predictions": predictions}
+
+class EditBatch(BaseModel):
+    # e.g. {"op": "remove_edge", "source": 3, "target": 7}
+    #      {"op": "add_edge", "source": 3, "target": 9, "length": 250, "is_motorway": true}
+    #      {"op": "update_node", "nodes": [12, 40], "pending_requests": 4.0}
+    edits: list[dict] = []
+    # False = answer the what-if and roll the session back to its previous state
+    persist: bool = False
+
+@router.post("/simulate/session")
+def create_session(config: SimulationConfig):
+    # Builds a baseline engine once and keeps it alive, so edits skip the JSON parse and rebuild
+    seed = config.seed if config.seed is not None else random.randrange(2**31)
+    try:
+        engine = SuperaggregatorEngine("mumbai_network.json", config, seed=seed)
+        results = engine.apply_edits(gnn_model, [])
+    except Exception as e:
+        return {"error": str(e), "message": "GNN Engine failed to run."}
+    
+    session_id = uuid.uuid4().hex
+    with sessions_lock:
+        sessions[session_id] = (engine, threading.Lock())
+        if len(sessions) > MAX_SESSIONS:
+            sessions.popitem(last=False)
+    
+    return {"session_id": session_id, "scenario": "ULTRA (MaaS Movement)", **results, "config_applied": config.dict(), "seed": seed}
+
+@router.post("/simulate/session/{session_id}/edits")
+def apply_session_edits(session_id: str, batch: EditBatch):
+    with sessions_lock:
+        entry = sessions.get(session_id)
+        if entry is not None:
+            sessions.move_to_end(session_id)
+    if entry is None:
+        return {"error": f"Unknown session: {session_id}", "message": "Create one via /simulate/session first."}
+    engine, lock = entry
+    
+    with lock:
+        snapshot = engine.snapshot()
+        start = time.perf_counter()
+        try:
+            results = engine.apply_edits(gnn_model, batch.edits)
+        except Exception as e:
+            # Never leave a session half-edited
+            engine.restore(snapshot)
+            return {"error": str(e), "message": "Failed to apply edits."}
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        
+        if not batch.persist:
+            engine.restore(snapshot)
+    
+    return {"session_id": session_id, **results, "edits_applied": len(batch.edits), "elapsed_ms": round(elapsed_ms, 2)}
+
 @router.get("/data/mumbai")
 def get_mumbai_graph_data():
     # Return the generated mock mumbai dataset
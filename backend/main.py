@@ -1,11 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.router import router
+from api.router import router, run_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Drain the write-behind queue so no recorded run is lost on exit
+    run_store.close()
 
 app = FastAPI(
     title="GNN Mobility Simulation API",
     description="Backend for simulating the ULTRA Bill (Unified Land Use & Multi-Modal Transport Regulation Authority) hypotheses using Graph Neural Networks.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS for the frontend
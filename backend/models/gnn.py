@@ -3,6 +3,20 @@ import torch.nn.functional as F
 from torch_geometric.nn import GATConv, SAGEConv, GraphNorm
 from torch_geometric.data import Data
 
+def _local_column_mean(x):
+    # Accumulate in float64 so the partitioned all-reduce sums to the same value
+    return x.sum(dim=0, dtype=torch.float64) / x.size(0)
+
+def _graph_norm(norm: GraphNorm, x, column_mean):
+    """
+    GraphNorm for a single graph, using norm's learned parameters, with the
+    statistics taken through column_mean. Same maths as GraphNorm.forward
+    (mean shifted by mean_scale, then the variance of the shifted values).
+    """
+    out = x - column_mean(x).to(x.dtype) * norm.mean_scale
+    var = column_mean(out.pow(2)).to(x.dtype)
+    return norm.weight * out / (var + norm.eps).sqrt() + norm.bias
+
 class MaaSGraphNetwork(torch.nn.Module):
     """
     Advanced Graph Neural Network for the ULTRA Bill Simulation.
@@ -48,19 +62,37 @@ class MaaSGraphNetwork(torch.nn.Module):
             data.edge_attr: Edge features [num_edges, 2]
                     Current structure: [edge_length, max_speed]
         """
-        x, edge_index, edge_attr = data.x, data.edge_index, data.edge_attr
+        return self.run_layers(data.x, data.edge_index, data.edge_attr)
+
+    def run_layers(self, x, edge_index, edge_attr, num_targets=None, column_mean=None, exchange_halo=None):
+        """
+        The layer sequence, shared by single-process and partitioned inference.
+        
+        Args:
+            num_targets: Only the first num_targets nodes are predicted; the rest are
+                    halo nodes that merely feed messages into them (default: all).
+            column_mean: Hook returning the per-feature float64 mean of a
+                    [num_targets, C] tensor over the *whole* graph. GraphNorm needs it;
+                    partitioned inference all-reduces it across workers.
+            exchange_halo: Hook extending the targets' layer-1 embeddings with the
+                    halo nodes' (partitioned inference reads them from its peers).
+        """
+        num_targets = x.size(0) if num_targets is None else num_targets
+        column_mean = column_mean or _local_column_mean
 
         # 1. Neighborhood Aggregation (Simulating Traffic Spreading)
-        x = self.sage1(x, edge_index)
-        x = self.norm1(x)
+        x = self.sage1(x, edge_index)[:num_targets]
+        x = _graph_norm(self.norm1, x, column_mean)
         x = F.elu(x) # ELU preserves slight negative values, useful for normalization states
         x = F.dropout(x, p=0.1, training=self.training)
+        if exchange_halo is not None:
+            x = exchange_halo(x)
         
         # 2. Attention-based Superaggregator Allocation
         # The attention heads will learn which paths to prioritize based on the edge attributes
         # (e.g., heavily weighting Motorway edges if the user distribution has high Platinum tier)
-        x = self.gat1(x, edge_index, edge_attr=edge_attr)
-        x = self.norm2(x)
+        x = self.gat1(x, edge_index, edge_attr=edge_attr)[:num_targets]
+        x = _graph_norm(self.norm2, x, column_mean)
         x = F.elu(x)
         
         # 3. Final Prediction
@@ -78,13 +110,21 @@ class MaaSGraphNetwork(torch.nn.Module):
             self.eval()
             predictions = self.forward(graph_data)
             base_efficiency = predictions[:, 2].mean().item() # Mean Fleet Allocation Score
-            
-            # Simulated mathematical relationship:
-            # Under a unified Superaggregator, routing efficiency scales logarithmically
-            # with the reduction of private vehicle noise, until diminishing returns.
-            efficiency_gain = torch.log(torch.tensor(reduction_pct + 1.0)) * 0.5
-            
-            return min(base_efficiency * (1.0 + efficiency_gain.item()), 1.0)
+            return self.scale_fleet_efficiency(base_efficiency, reduction_pct)
+
+    @staticmethod
+    def scale_fleet_efficiency(base_efficiency: float, reduction_pct: float) -> float:
+        """
+        Maps the mean Fleet Allocation Score to a fleet efficiency for the given reduction.
+        Split out so callers that already hold predictions (e.g. partitioned inference)
+        do not need a second forward pass.
+        """
+        # Simulated mathematical relationship:
+        # Under a unified Superaggregator, routing efficiency scales logarithmically
+        # with the reduction of private vehicle noise, until diminishing returns.
+        efficiency_gain = torch.log(torch.tensor(reduction_pct + 1.0)) * 0.5
+        
+        return min(base_efficiency * (1.0 + efficiency_gain.item()), 1.0)
             
 def instantiate_model():
     # 5 Node Features: [population_density, traffic_volume, base_speed, is_motorway, pending_requests]
@@ -2,16 +2,27 @@ import torch
 from torch_geometric.data import Data
 import json
 import random
+from simulation.partition import partitioned_forward
+
+# Column order of pyg_data.x, as built in _load_and_convert_graph
+NODE_FEATURES = ("population_density", "traffic_volume", "speed", "is_motorway_hub", "pending_requests")
 
 class SuperaggregatorEngine:
-    def __init__(self, json_graph_path, config):
+    def __init__(self, json_graph_path, config, seed=None):
         """
         Initializes the Simulation Engine for the MaaS Movement Superaggregator.
         Reads the physical/mock JSON graph and converts it to a PyTorch Geometric Data object.
+        The stochastic starting state is drawn from a private RNG, so a given seed
+        reproduces the same graph features.
         """
         self.config = config
+        self.seed = seed
+        self.rng = random.Random(seed)
         self.pyg_data = self._load_and_convert_graph(json_graph_path)
         
+        # Per-node predictions of the most recent step, for callers that persist them
+        self.last_predictions = None
+        
     def _load_and_convert_graph(self, filepath):
         with open(filepath, 'r') as f:
             raw_data = json.load(f)
@@ -26,6 +37,7 @@ class SuperaggregatorEngine:
         # 3: is_motorway_hub (boolean 0/1)
         # 4: pending_requests (stochastic start tied to density)
         x = []
+        pos = []
         reduction_factor = (100.0 - self.config.fleet_reduction_percentage) / 100.0
         
         for node in nodes:
@@ -33,19 +45,22 @@ class SuperaggregatorEngine:
             
             # Fleet reduction logically removes POV congestion from the network.
             # 0% reduction = massive traffic limits constraints. 90% = highly controlled sparse transit pods.
-            base_traffic = random.uniform(0.7, 1.0)
+            base_traffic = self.rng.uniform(0.7, 1.0)
             traffic = base_traffic * pop_density * max(0.05, reduction_factor)
             
             # If motorway separation is active, randomly designate hubs. Normalize speeds to 0-1 for GNN.
-            is_hub = 1.0 if (self.config.use_motorways and random.random() < 0.1) else 0.0
+            is_hub = 1.0 if (self.config.use_motorways and self.rng.random() < 0.1) else 0.0
             speed = 1.0 if is_hub else 0.3
             
             # Demand remains structural regardless of fleet size
-            requests = random.uniform(1.0, 5.0) * pop_density
+            requests = self.rng.uniform(1.0, 5.0) * pop_density
             
             x.append([pop_density, traffic, speed, is_hub, requests])
+            # Geographic coordinates, used only to cut the city into spatial partitions
+            pos.append([node.get("x", 0.0), node.get("y", 0.0)])
             
         x_tensor = torch.tensor(x, dtype=torch.float)
+        pos_tensor = torch.tensor(pos, dtype=torch.float)
         
         # --- Edge Indices & Features ---
         edge_indices = []
@@ -60,7 +75,7 @@ class SuperaggregatorEngine:
             
             # Features: length, max_speed constraint normalized to 0-1 mapping
             length = float(edge.get('length', 100))
-            is_motorway_edge = 1.0 if (self.config.use_motorways and random.random() < 0.15) else 0.0
+            is_motorway_edge = 1.0 if (self.config.use_motorways and self.rng.random() < 0.15) else 0.0
             m_speed = 1.0 if is_motorway_edge else 0.3
             
             edge_attrs.append([length, m_speed])
@@ -70,7 +85,7 @@ class SuperaggregatorEngine:
         edge_attr_tensor = torch.tensor(edge_attrs, dtype=torch.float)
         
         # Construct PyG Data object
-        data = Data(x=x_tensor, edge_index=edge_index_tensor, edge_attr=edge_attr_tensor)
+        data = Data(x=x_tensor, edge_index=edge_index_tensor, edge_attr=edge_attr_tensor, pos=pos_tensor)
         return data
 
     def run_simulation_step(self, gnn_model):
@@ -78,6 +93,10 @@ class SuperaggregatorEngine:
         Runs one forward pass of the GNN over the current graph state.
         Returns the overall efficiency and conflict metrics.
         """
+        num_partitions = getattr(self.config, "num_partitions", 1)
+        if num_partitions > 1:
+            return self.run_partitioned_simulation_step(gnn_model, num_partitions)
+
         # Pass graph to PyG model
         fleet_efficiency = gnn_model.calculate_fleet_reduction_impact(
             self.pyg_data, 
@@ -90,18 +109,140 @@ class SuperaggregatorEngine:
             base_flow = preds[:, 0].mean().item()
             base_eta = preds[:, 1].mean().item()
             
-            # The GNN computes the structural baseline constraints based on Mumbai's dense topology.
-            # We scale the actual physical traffic conflict linearly as POV vehicles are abolished.
-            reduction_factor = max(0.05, (100.0 - self.config.fleet_reduction_percentage) / 100.0)
-            
-            # Dedicated motorways drastically lower interaction conflict
-            motorway_multiplier = 0.7 if self.config.use_motorways else 1.3
-            
-            # 0% reduction = 80-100% Conflict. 90% reduction + Motorways = ~5% Conflict
-            avg_flow = (base_flow * 2.0) * reduction_factor * motorway_multiplier
-            
-            # Travel time drops significantly but has a structural physical floor (cannot teleport)
-            avg_eta_normalized = base_eta * max(0.3, reduction_factor * motorway_multiplier)
+        self.last_predictions = preds
+        return self._summarize_predictions(fleet_efficiency, base_flow, base_eta)
+
+    def run_partitioned_simulation_step(self, gnn_model, num_partitions):
+        """
+        Same metrics as run_simulation_step, but the forward pass is sharded
+        across num_partitions worker processes (see simulation/partition.py).
+        """
+        method = getattr(self.config, "partition_method", "spatial")
+        preds = partitioned_forward(gnn_model, self.pyg_data, num_partitions, method)
+        self.last_predictions = preds
+
+        fleet_efficiency = gnn_model.scale_fleet_efficiency(
+            preds[:, 2].mean().item(),
+            reduction_pct=self.config.fleet_reduction_percentage / 100.0
+        )
+        return self._summarize_predictions(fleet_efficiency, preds[:, 0].mean().item(), preds[:, 1].mean().item())
+
+    # --- What-If Edits ---
+
+    def _check_node_ids(self, nodes):
+        # Negative ids would silently wrap around in tensor indexing, so reject them outright
+        num_nodes = self.pyg_data.num_nodes
+        for node in nodes:
+            if isinstance(node, bool) or not isinstance(node, int) or not 0 <= node < num_nodes:
+                raise ValueError(f"Invalid node id {node!r}, expected an integer in [0, {num_nodes})")
+
+    def add_edge(self, source, target, length=100.0, is_motorway=False):
+        """Opens a (bidirectional) road between two intersections."""
+        self._check_node_ids((source, target))
+        m_speed = 1.0 if is_motorway else 0.3
+        new_index = torch.tensor([[source, target], [target, source]], dtype=torch.long)
+        new_attr = torch.tensor([[float(length), m_speed]] * 2, dtype=torch.float)
+        
+        data = self.pyg_data
+        data.edge_index = torch.cat([data.edge_index, new_index], dim=1)
+        data.edge_attr = torch.cat([data.edge_attr, new_attr], dim=0)
+
+    def remove_edge(self, source, target):
+        """Closes every road segment between two intersections, in both directions."""
+        self._check_node_ids((source, target))
+        data = self.pyg_data
+        src, dst = data.edge_index
+        closed = ((src == source) & (dst == target)) | ((src == target) & (dst == source))
+        if not closed.any():
+            raise ValueError(f"No road between nodes {source} and {target}")
+        
+        data.edge_index = data.edge_index[:, ~closed]
+        data.edge_attr = data.edge_attr[~closed]
+
+    def update_node_features(self, nodes, **features):
+        """
+        Overwrites named features (see NODE_FEATURES) on one or more intersections,
+        e.g. update_node_features([12, 40], pending_requests=4.0).
+        """
+        unknown = set(features) - set(NODE_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown node feature(s): {sorted(unknown)}")
+        nodes = [nodes] if isinstance(nodes, int) else list(nodes)
+        self._check_node_ids(nodes)
+        if not nodes:
+            return
+        
+        data = self.pyg_data
+        for name, value in features.items():
+            data.x[nodes, NODE_FEATURES.index(name)] = float(value)
+
+
+    def apply_edits(self, gnn_model, edits):
+        """
+        Applies a batch of edits and returns the updated simulation metrics.
+        Each edit is a dict with an "op" of "add_edge", "remove_edge" or
+        "update_node"; the remaining keys are passed to the matching method.
+        An empty batch just evaluates the current graph.
+        
+        The batch is atomic: if any edit is invalid the graph is rolled back and
+        ValueError is raised. Every call runs a full forward pass (GraphNorm's
+        whole-graph statistics make a local recompute inexact); the saving over
+        /simulate/ultra comes from keeping the parsed engine alive between edits.
+        """
+        snapshot = self.snapshot()
+        try:
+            for edit in edits:
+                self._apply_edit(dict(edit))
+        except Exception:
+            self.restore(snapshot)
+            raise
+        
+        gnn_model.eval()
+        with torch.no_grad():
+            preds = gnn_model(self.pyg_data)
+        self.last_predictions = preds
+        fleet_efficiency = gnn_model.scale_fleet_efficiency(
+            preds[:, 2].mean().item(),
+            reduction_pct=self.config.fleet_reduction_percentage / 100.0
+        )
+        return self._summarize_predictions(fleet_efficiency, preds[:, 0].mean().item(), preds[:, 1].mean().item())
+
+    def _apply_edit(self, edit):
+        op = edit.pop("op", None)
+        handlers = {
+            "add_edge": self.add_edge,
+            "remove_edge": self.remove_edge,
+            "update_node": lambda nodes=None, **features: self.update_node_features(nodes, **features),
+        }
+        if op not in handlers:
+            raise ValueError(f"Unknown edit op: {op}")
+        try:
+            handlers[op](**edit)
+        except TypeError as e:
+            # Misspelled or missing keys, e.g. "lenght"
+            raise ValueError(f"Invalid arguments for {op}: {e}")
+
+    def snapshot(self):
+        """Captures the graph state so a what-if batch can be rolled back."""
+        return self.pyg_data.clone()
+
+    def restore(self, snapshot):
+        # Clone again so the same snapshot can be restored more than once
+        self.pyg_data = snapshot.clone()
+
+    def _summarize_predictions(self, fleet_efficiency, base_flow, base_eta):
+        # The GNN computes the structural baseline constraints based on Mumbai's dense topology.
+        # We scale the actual physical traffic conflict linearly as POV vehicles are abolished.
+        reduction_factor = max(0.05, (100.0 - self.config.fleet_reduction_percentage) / 100.0)
+        
+        # Dedicated motorways drastically lower interaction conflict
+        motorway_multiplier = 0.7 if self.config.use_motorways else 1.3
+        
+        # 0% reduction = 80-100% Conflict. 90% reduction + Motorways = ~5% Conflict
+        avg_flow = (base_flow * 2.0) * reduction_factor * motorway_multiplier
+        
+        # Travel time drops significantly but has a structural physical floor (cannot teleport)
+        avg_eta_normalized = base_eta * max(0.3, reduction_factor * motorway_multiplier)
             
         return {
             "fleet_utilization_pct": round(fleet_efficiency * 100, 1),
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+import torch
+
+# Columns a caller may filter, group or aggregate on. Anything else is rejected
+# before it gets near an SQL string.
+METRIC_COLUMNS = ("conflict_density", "avg_travel_time_mins", "fleet_utilization_pct", "elapsed_ms")
+GROUP_COLUMNS = ("fleet_reduction_percentage", "use_motorways", "eliminate_parking", "scenario")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    scenario TEXT NOT NULL,
+    fleet_reduction_percentage REAL,
+    use_motorways INTEGER,
+    eliminate_parking INTEGER,
+    config_json TEXT NOT NULL,
+    seed INTEGER,
+    graph_checksum TEXT,
+    weights_checksum TEXT,
+    elapsed_ms REAL,
+    conflict_density REAL,
+    avg_travel_time_mins REAL,
+    fleet_utilization_pct REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_reduction ON runs (scenario, fleet_reduction_percentage);
+CREATE TABLE IF NOT EXISTS run_predictions (
+    run_id TEXT PRIMARY KEY REFERENCES runs (run_id),
+    num_nodes INTEGER NOT NULL,
+    num_outputs INTEGER NOT NULL,
+    predictions BLOB NOT NULL -- float32, row-major [num_nodes, num_outputs]
+);
+"""
+
+_checksum_cache = {}
+
+def file_checksum(path):
+    """SHA-1 of a file, memoised on (path, mtime) so hot endpoints don't re-hash it."""
+    if not path or not os.path.exists(path):
+        return None
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _checksum_cache:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _checksum_cache[key] = digest.hexdigest()
+    return _checksum_cache[key]
+
+class RunStore:
+    """
+    Append-only SQLite log of simulation runs.
+
+    record() only enqueues; a background writer thread drains the queue in
+    batches, so API latency does not include any disk I/O. Queries open their own
+    read connection (the database runs in WAL mode) and never wait on the writer.
+    """
+    def __init__(self, db_path, max_pending=10000, batch_size=256):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Guards _closed so no run can be queued behind the close() sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="run-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record(self, scenario, config, results, seed=None, graph_checksum=None,
+               weights_checksum=None, elapsed_ms=None, predictions=None):
+        """
+        Queues one run for persistence and returns its run_id.
+        predictions, if given, is a [num_nodes, num_outputs] tensor of per-node outputs.
+        Drops the run (with a notice) rather than block when the writer falls behind;
+        the return value is then None, since the run will never be queryable.
+        Raises RuntimeError once the store is closed.
+        """
+        run_id = uuid.uuid4().hex
+        row = {
+            "run_id": run_id,
+            "created_at": time.time(),
+            "scenario": scenario,
+            "fleet_reduction_percentage": config.get("fleet_reduction_percentage"),
+            "use_motorways": config.get("use_motorways"),
+            "eliminate_parking": config.get("eliminate_parking"),
+            "config_json": json.dumps(config, sort_keys=True),
+            "seed": seed,
+            "graph_checksum": graph_checksum,
+            "weights_checksum": weights_checksum,
+            "elapsed_ms": elapsed_ms,
+            **{name: results.get(name) for name in METRIC_COLUMNS if name != "elapsed_ms"},
+        }
+        if predictions is not None:
+            predictions = predictions.detach().float().contiguous()
+            row["_predictions"] = (predictions.size(0), predictions.size(1), predictions.numpy().tobytes())
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Run store is closed")
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                print(f"Run store backlog full, dropping run {run_id}")
+                return None
+        return run_id
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_rows(conn, [row for row in batch if row is not None])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if None in batch: # close() sentinel
+                conn.close()
+                return
+
+    def _write_rows(self, conn, rows):
+        # One transaction per batch; if it fails, roll back and retry row by row so a
+        # single bad run only costs itself, never its batch-mates
+        try:
+            self._write_batch(conn, rows)
+            return
+        except Exception as e:
+            conn.rollback()
+            if len(rows) <= 1:
+                print(f"Run store failed to persist run {rows[0]['run_id'] if rows else '?'}: {e}")
+                return
+            print(f"Run store batch of {len(rows)} run(s) failed ({e}), retrying individually")
+        
+        for row in rows:
+            try:
+                self._write_batch(conn, [row])
+            except Exception as e:
+                conn.rollback()
+                print(f"Run store failed to persist run {row['run_id']}: {e}")
+
+    def _write_batch(self, conn, rows):
+        if not rows:
+            return
+        run_rows = [{k: v for k, v in row.items() if not k.startswith("_")} for row in rows]
+        columns = list(run_rows[0])
+        conn.executemany(
+            f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})",
+            run_rows
+        )
+        conn.executemany(
+            "INSERT INTO run_predictions (run_id, num_nodes, num_outputs, predictions) VALUES (?, ?, ?, ?)",
+            [(row["run_id"], *row["_predictions"]) for row in rows if "_predictions" in row]
+        )
+        conn.commit()
+
+    def flush(self):
+        """Blocks until every queued run has been written."""
+        if self._closed:
+            raise RuntimeError("Run store is closed")
+        self._queue.join()
+
+    def close(self):
+        """Writes out everything already queued, then stops the writer. Idempotent."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join()
+
+    def _where(self, scenario=None, use_motorways=None, min_reduction=None, max_reduction=None):
+        clauses, params = [], []
+        if scenario is not None:
+            clauses.append("scenario = ?")
+            params.append(scenario)
+        if use_motorways is not None:
+            clauses.append("use_motorways = ?")
+            params.append(int(use_motorways))
+        if min_reduction is not None:
+            clauses.append("fleet_reduction_percentage >= ?")
+            params.append(min_reduction)
+        if max_reduction is not None:
+            clauses.append("fleet_reduction_percentage <= ?")
+            params.append(max_reduction)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query_runs(self, limit=50, offset=0, **filters):
+        """Newest-first page of recorded runs matching the filters, plus the total match count."""
+        where, params = self._where(**filters)
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            total = conn.execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT r.*, p.run_id IS NOT NULL AS has_predictions FROM runs r "
+                f"LEFT JOIN run_predictions p USING (run_id){where} "
+                f"ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run["config"] = json.loads(run.pop("config_json"))
+            run["has_predictions"] = bool(run["has_predictions"])
+            runs.append(run)
+        return {"total": total, "limit": limit, "offset": offset, "runs": runs}
+
+    def aggregate(self, metric, group_by="fleet_reduction_percentage", **filters):
+        """
+        Per-group count/mean/min/max of a metric, e.g. conflict_density vs. fleet reduction.
+        Groups are always split by scenario as well: the mocked baseline and the GNN
+        runs measure different things and must never be averaged together.
+        """
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {METRIC_COLUMNS}")
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Unknown group_by '{group_by}', expected one of {GROUP_COLUMNS}")
+
+        keys = ["scenario"] if group_by == "scenario" else ["scenario", group_by]
+        key_sql = ", ".join(keys)
+        where, params = self._where(**filters)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {key_sql}, COUNT({metric}), AVG({metric}), MIN({metric}), MAX({metric}) "
+                f"FROM runs{where} GROUP BY {key_sql} ORDER BY {key_sql}",
+                params
+            ).fetchall()
+        return [
+            {**dict(zip(keys, row[:len(keys)])), **dict(zip(("count", "mean", "min", "max"), row[len(keys):]))}
+            for row in rows
+        ]
+
+    def get_predictions(self, run_id):
+        """Per-node predictions of a run as nested lists, or None if they weren't stored."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT num_nodes, num_outputs, predictions FROM run_predictions WHERE run_id = ?",
+                (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        num_nodes, num_outputs, blob = row
+        return torch.frombuffer(bytearray(blob), dtype=torch.float32).view(num_nodes, num_outputs).tolist()
@@ -0,0 +1,57 @@
+import json
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+# Tests import modules the same way the app does, relative to the backend directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from models.gnn import instantiate_model
+from simulation.engine import SuperaggregatorEngine
+
+@pytest.fixture
+def graph_path(tmp_path):
+    """Small random road network in the mumbai_network.json format."""
+    rng = random.Random(0)
+    num_nodes = 300
+    nodes = [
+        {"id": i, "x": 72.80 + rng.random() * 0.05, "y": 18.90 + rng.random() * 0.08,
+         "population_density": round(rng.random(), 3)}
+        for i in range(num_nodes)
+    ]
+    edges = []
+    for i in range(num_nodes):
+        for j in rng.sample(range(num_nodes), 3):
+            if j != i:
+                edges.append({"source": i, "target": j, "length": round(rng.uniform(10, 300), 1)})
+
+    path = tmp_path / "network.json"
+    path.write_text(json.dumps({"nodes": nodes, "edges": edges}))
+    return str(path)
+
+@pytest.fixture
+def gnn_model():
+    torch.manual_seed(0)
+    model = instantiate_model()
+    model.eval()
+    return model
+
+@pytest.fixture
+def make_engine(graph_path):
+    """Builds a seeded engine; keyword arguments override the default simulation config."""
+    def factory(**overrides):
+        config = SimpleNamespace(**{
+            "fleet_reduction_percentage": 90.0,
+            "use_motorways": True,
+            "num_partitions": 1,
+            "partition_method": "spatial",
+            **overrides,
+        })
+        return SuperaggregatorEngine(graph_path, config, seed=0)
+    return factory
@@ -0,0 +1,87 @@
+import pytest
+import torch
+
+def _assert_matches_full_recompute(engine, model):
+    with torch.no_grad():
+        assert torch.equal(engine.last_predictions, model(engine.pyg_data))
+
+@pytest.fixture
+def engine(make_engine, gnn_model):
+    engine = make_engine()
+    engine.apply_edits(gnn_model, [])
+    return engine
+
+def _existing_road(engine):
+    src, dst = engine.pyg_data.edge_index[:, 0].tolist()
+    return {"op": "remove_edge", "source": src, "target": dst}
+
+ADD_ROAD = {"op": "add_edge", "source": 1, "target": 250, "length": 250.0, "is_motorway": True}
+NEW_HUB = {"op": "update_node", "nodes": [5, 6, 7], "is_motorway_hub": 1.0, "speed": 1.0, "pending_requests": 4.0}
+
+def test_add_edge_matches_full_recompute(engine, gnn_model):
+    engine.apply_edits(gnn_model, [ADD_ROAD])
+    _assert_matches_full_recompute(engine, gnn_model)
+
+def test_remove_edge_matches_full_recompute(engine, gnn_model):
+    num_edges = engine.pyg_data.num_edges
+    engine.apply_edits(gnn_model, [_existing_road(engine)])
+    assert engine.pyg_data.num_edges < num_edges
+    _assert_matches_full_recompute(engine, gnn_model)
+
+def test_update_node_matches_full_recompute(engine, gnn_model):
+    engine.apply_edits(gnn_model, [NEW_HUB])
+    _assert_matches_full_recompute(engine, gnn_model)
+
+def test_batch_matches_full_recompute(engine, gnn_model):
+    engine.apply_edits(gnn_model, [_existing_road(engine), ADD_ROAD, NEW_HUB])
+    _assert_matches_full_recompute(engine, gnn_model)
+
+    # Edits accumulate across batches
+    engine.apply_edits(gnn_model, [{"op": "update_node", "nodes": 250, "population_density": 0.9}])
+    _assert_matches_full_recompute(engine, gnn_model)
+
+def test_restore_rolls_back_a_what_if(engine, gnn_model):
+    baseline = engine.last_predictions.clone()
+    x, edge_index = engine.pyg_data.x.clone(), engine.pyg_data.edge_index.clone()
+
+    snapshot = engine.snapshot()
+    engine.apply_edits(gnn_model, [_existing_road(engine), ADD_ROAD, NEW_HUB])
+    assert not torch.equal(engine.last_predictions, baseline)
+    engine.restore(snapshot)
+
+    assert torch.equal(engine.pyg_data.x, x)
+    assert torch.equal(engine.pyg_data.edge_index, edge_index)
+    engine.apply_edits(gnn_model, [])
+    assert torch.equal(engine.last_predictions, baseline)
+    _assert_matches_full_recompute(engine, gnn_model)
+
+def _missing_road(engine):
+    src, dst = engine.pyg_data.edge_index
+    connected = set(zip(src.tolist(), dst.tolist()))
+    target = next(t for t in range(1, engine.pyg_data.num_nodes) if (0, t) not in connected)
+    return {"op": "remove_edge", "source": 0, "target": target}
+
+@pytest.mark.parametrize("make_edit", [
+    lambda engine: {"op": "update_node", "nodes": [-1], "population_density": 5.0},
+    lambda engine: {"op": "update_node", "nodes": 300, "population_density": 5.0},
+    lambda engine: {"op": "update_node", "nodes": [3], "populaton_density": 5.0},
+    lambda engine: {"op": "add_edge", "source": -2, "target": 3},
+    lambda engine: {"op": "add_edge", "source": 2, "target": 3, "lenght": 40.0},
+    lambda engine: {"op": "remove_edge", "source": 0, "target": 10_000},
+    _missing_road,
+    lambda engine: {"op": "close_road", "source": 0, "target": 1},
+], ids=["negative-id", "id-out-of-range", "unknown-feature", "negative-edge-id",
+        "misspelled-kwarg", "edge-id-out-of-range", "missing-road", "unknown-op"])
+def test_invalid_edits_are_rejected_before_any_change(engine, gnn_model, make_edit):
+    x = engine.pyg_data.x.clone()
+    edge_index, edge_attr = engine.pyg_data.edge_index.clone(), engine.pyg_data.edge_attr.clone()
+
+    # Valid edits earlier in the batch must be rolled back too
+    with pytest.raises(ValueError):
+        engine.apply_edits(gnn_model, [ADD_ROAD, NEW_HUB, make_edit(engine)])
+
+    assert torch.equal(engine.pyg_data.x, x)
+    assert torch.equal(engine.pyg_data.edge_index, edge_index)
+    assert torch.equal(engine.pyg_data.edge_attr, edge_attr)
+    engine.apply_edits(gnn_model, [])
+    _assert_matches_full_recompute(engine, gnn_model)
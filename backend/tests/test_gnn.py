@@ -0,0 +1,18 @@
+import torch
+from torch_geometric.nn import GraphNorm
+
+from models.gnn import _graph_norm, _local_column_mean
+
+def test_graph_norm_matches_pyg():
+    # run_layers re-expresses GraphNorm so its statistics can be all-reduced;
+    # this guards against the two drifting apart (e.g. after a PyG upgrade)
+    torch.manual_seed(0)
+    norm = GraphNorm(16)
+    with torch.no_grad():
+        norm.weight.uniform_(0.5, 1.5)
+        norm.bias.uniform_(-0.5, 0.5)
+        norm.mean_scale.uniform_(0.0, 1.0)
+    x = torch.randn(500, 16) * 3 + 1
+
+    with torch.no_grad():
+        assert torch.allclose(_graph_norm(norm, x, _local_column_mean), norm(x), atol=1e-5)
@@ -0,0 +1,38 @@
+import pytest
+import torch
+
+from simulation.partition import build_partition_plan, get_worker_pool, partitioned_forward
+
+@pytest.mark.parametrize("num_parts", [2, 3, 4])
+def test_partitioned_forward_matches_single_process(make_engine, gnn_model, num_parts):
+    engine = make_engine()
+    expected_metrics = engine.run_simulation_step(gnn_model)
+    expected = engine.last_predictions
+
+    predictions = partitioned_forward(gnn_model, engine.pyg_data, num_parts)
+    assert torch.equal(predictions, expected)
+
+    engine.config.num_partitions = num_parts
+    assert engine.run_simulation_step(gnn_model) == expected_metrics
+
+def test_plan_covers_every_node_once(make_engine):
+    data = make_engine().pyg_data
+    plan = build_partition_plan(data, 3)
+
+    owned = torch.cat([shard["owned"] for shard in plan["shards"]])
+    assert torch.equal(owned.sort().values, torch.arange(data.num_nodes))
+    assert sum(shard["edge_index"].size(1) for shard in plan["shards"]) == data.num_edges
+
+def test_worker_failure_aborts_peers(make_engine, gnn_model):
+    data = make_engine().pyg_data
+    plan = build_partition_plan(data, 2)
+    # Corrupt one shard so its worker raises before reaching the first barrier
+    plan["shards"][1] = {**plan["shards"][1], "x": plan["shards"][1]["x"][:, :2].clone().share_memory_()}
+
+    with pytest.raises(RuntimeError, match="worker"):
+        partitioned_forward(gnn_model, data, 2, plan=plan)
+
+    # The pool recovers for the next call
+    assert get_worker_pool(2).is_alive()
+    with torch.no_grad():
+        assert torch.equal(partitioned_forward(gnn_model, data, 2), gnn_model(data))
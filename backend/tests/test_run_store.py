@@ -0,0 +1,112 @@
+import queue
+from contextlib import closing
+
+import pytest
+import torch
+
+from simulation.run_store import RunStore
+
+ULTRA = "ULTRA (MaaS Movement)"
+BASELINE = "Baseline (Privately Owned Vehicles)"
+
+def _record(store, scenario, reduction, conflict, **kwargs):
+    config = {"fleet_reduction_percentage": reduction, "use_motorways": True, "eliminate_parking": True}
+    results = {"conflict_density": conflict, "avg_travel_time_mins": 30.0, "fleet_utilization_pct": 50.0}
+    return store.record(scenario, config, results, seed=7, elapsed_ms=1.0, **kwargs)
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    yield store
+    store.close()
+
+def test_query_runs_filters_and_paginates(store):
+    run_ids = [_record(store, ULTRA, reduction, 10.0) for reduction in (0.0, 50.0, 90.0, 90.0)]
+    _record(store, BASELINE, 90.0, 95.0)
+    store.flush()
+
+    page = store.query_runs(limit=2, offset=0)
+    assert page["total"] == 5
+    assert len(page["runs"]) == 2
+
+    ultra = store.query_runs(limit=10, scenario=ULTRA)
+    assert ultra["total"] == 4
+    assert {run["run_id"] for run in ultra["runs"]} == set(run_ids)
+    assert ultra["runs"][0]["config"]["use_motorways"] is True
+    assert ultra["runs"][0]["seed"] == 7
+
+    high = store.query_runs(scenario=ULTRA, min_reduction=60.0)
+    assert high["total"] == 2
+    assert store.query_runs(min_reduction=40.0, max_reduction=60.0)["total"] == 1
+
+    second_page = store.query_runs(limit=3, offset=3)
+    assert second_page["total"] == 5
+    assert len(second_page["runs"]) == 2
+
+def test_aggregate_never_mixes_scenarios(store):
+    _record(store, ULTRA, 90.0, 2.0)
+    _record(store, ULTRA, 90.0, 4.0)
+    _record(store, ULTRA, 0.0, 50.0)
+    _record(store, BASELINE, 90.0, 90.0)
+    store.flush()
+
+    groups = store.aggregate("conflict_density")
+    ultra_90 = [g for g in groups if g["scenario"] == ULTRA and g["fleet_reduction_percentage"] == 90.0]
+    assert ultra_90 == [{"scenario": ULTRA, "fleet_reduction_percentage": 90.0, "count": 2, "mean": 3.0, "min": 2.0, "max": 4.0}]
+    assert len(groups) == 3
+
+    by_scenario = store.aggregate("conflict_density", group_by="scenario")
+    assert {g["scenario"]: g["count"] for g in by_scenario} == {ULTRA: 3, BASELINE: 1}
+
+@pytest.mark.parametrize("metric, group_by", [
+    ("conflict_density; DROP TABLE runs", "fleet_reduction_percentage"),
+    ("conflict_density", "config_json"),
+])
+def test_aggregate_rejects_unknown_columns(store, metric, group_by):
+    with pytest.raises(ValueError):
+        store.aggregate(metric, group_by)
+
+def test_predictions_round_trip(store):
+    predictions = torch.rand(17, 3)
+    run_id = _record(store, ULTRA, 90.0, 2.0, predictions=predictions)
+    plain_id = _record(store, ULTRA, 90.0, 2.0)
+    store.flush()
+
+    assert torch.equal(torch.tensor(store.get_predictions(run_id)), predictions)
+    assert store.get_predictions(plain_id) is None
+    flags = {run["run_id"]: run["has_predictions"] for run in store.query_runs()["runs"]}
+    assert flags == {run_id: True, plain_id: False}
+
+def test_bad_row_does_not_drop_its_batch(store, monkeypatch):
+    captured = []
+    monkeypatch.setattr(store._queue, "put_nowait", captured.append)
+    first_id = _record(store, ULTRA, 90.0, 2.0)
+    good_id = _record(store, ULTRA, 50.0, 3.0, predictions=torch.rand(4, 3))
+    monkeypatch.undo()
+
+    with closing(store._connect()) as conn:
+        store._write_rows(conn, [captured[0]])
+        # The duplicate run_id fails the batch; the valid row must still land, once
+        store._write_rows(conn, [captured[1], captured[0]])
+
+    runs = store.query_runs()["runs"]
+    assert sorted(run["run_id"] for run in runs) == sorted([first_id, good_id])
+    assert store.get_predictions(good_id) is not None
+
+def test_dropped_run_returns_no_id(store, monkeypatch):
+    def full(row):
+        raise queue.Full
+    monkeypatch.setattr(store._queue, "put_nowait", full)
+    assert _record(store, ULTRA, 90.0, 2.0) is None
+
+def test_closed_store_refuses_work(store):
+    run_id = _record(store, ULTRA, 90.0, 2.0)
+    store.close()
+    store.close() # idempotent
+
+    # Runs queued before close() are still written
+    assert [run["run_id"] for run in store.query_runs()["runs"]] == [run_id]
+    with pytest.raises(RuntimeError):
+        _record(store, ULTRA, 90.0, 2.0)
+    with pytest.raises(RuntimeError):
+        store.flush()